@@ -27,5 +27,12 @@ MAX_MIRRORS_PER_USER = 1
 MAX_ACCESS_USERS = 10
 INACTIVITY_DAYS = 7
 
+# Хранилище: 'single' — один файл, 'sharded' — файл на каждого бота, 'memory' — для тестов
+STORAGE_BACKEND = "single"
+SHARDS_DIR = "shards"
+MAX_OPEN_SHARDS = 64
+
+print(f"✅ Хранилище: {STORAGE_BACKEND}")
+
 print("✅ Конфигурация загружена!")
 print("=" * 50)
\ No newline at end of file
@@ -3,69 +3,25 @@ import json
 import os
 from datetime import datetime, timedelta
 
+from registry import TenantRegistry
+from storage import SingleFileBackend
+
 class Database:
-    def __init__(self, db_name='mirror_bots.db'):
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+    def __init__(self, db_name='mirror_bots.db', backend=None):
+        self.backend = backend or SingleFileBackend(db_name)
+        self.conn = self.backend.control()
         self.cursor = self.conn.cursor()
-        self.init_db()
+        self._listeners = []
+        self.registry = TenantRegistry(self.conn)
+        self.subscribe(self.registry.refresh)
     
-    def init_db(self):
-        # Таблица для зеркальных ботов
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mirror_bots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                bot_token TEXT UNIQUE,
-                bot_username TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'active',
-                is_enabled BOOLEAN DEFAULT 1
-            )
-        ''')
-        
-        # Таблица для доступа к ботам
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bot_access (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                bot_token TEXT,
-                user_id INTEGER,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(bot_token, user_id)
-            )
-        ''')
-        
-        # Таблица для пользователей зеркальных ботов
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bot_users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                bot_token TEXT,
-                chat_name TEXT,
-                username TEXT,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Таблица для сообщений
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                bot_token TEXT,
-                message_text TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Таблица для рассылки
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS subscribers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER UNIQUE,
-                subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        self.conn.commit()
+    def subscribe(self, callback):
+        """Подписка на изменения mirror_bots: callback(bot_token или None)"""
+        self._listeners.append(callback)
+    
+    def _notify(self, bot_token=None):
+        for callback in self._listeners:
+            callback(bot_token)
     
     def add_mirror_bot(self, user_id, bot_token, bot_username):
         try:
@@ -89,6 +45,7 @@ class Database:
             )
             
             self.conn.commit()
+            self._notify(bot_token)
             return True, "success"
         except sqlite3.IntegrityError:
             return False, "already_exists"
@@ -107,63 +64,68 @@ class Database:
         return self.cursor.fetchall()
     
     def get_bot_by_token(self, token):
-        self.cursor.execute(
-            'SELECT * FROM mirror_bots WHERE bot_token = ?',
-            (token,)
-        )
-        return self.cursor.fetchone()
+        return self.registry.get_by_token(token)
     
     def get_bot_by_username(self, username):
-        self.cursor.execute(
-            'SELECT * FROM mirror_bots WHERE bot_username = ?',
-            (username,)
-        )
-        return self.cursor.fetchone()
+        return self.registry.get_by_username(username)
+    
+    def get_bot_by_id(self, bot_id):
+        return self.registry.get_by_id(bot_id)
     
     def add_users_to_bot(self, bot_token, chat_name, usernames):
-        for username in usernames:
-            self.cursor.execute(
+        with self.backend.tenant(bot_token) as conn:
+            conn.executemany(
                 'INSERT INTO bot_users (bot_token, chat_name, username) VALUES (?, ?, ?)',
-                (bot_token, chat_name, username.strip())
+                [(bot_token, chat_name, username.strip()) for username in usernames]
             )
-        self.conn.commit()
+            conn.commit()
     
     def get_bot_users(self, bot_token, page=1, limit=300):
         offset = (page - 1) * limit
-        self.cursor.execute(
-            'SELECT * FROM bot_users WHERE bot_token = ? LIMIT ? OFFSET ?',
-            (bot_token, limit, offset)
-        )
-        return self.cursor.fetchall()
+        with self.backend.tenant(bot_token) as conn:
+            return conn.execute(
+                'SELECT * FROM bot_users WHERE bot_token = ? LIMIT ? OFFSET ?',
+                (bot_token, limit, offset)
+            ).fetchall()
     
     def count_bot_users(self, bot_token):
-        self.cursor.execute(
-            'SELECT COUNT(*) FROM bot_users WHERE bot_token = ?',
-            (bot_token,)
-        )
-        return self.cursor.fetchone()[0]
+        with self.backend.tenant(bot_token) as conn:
+            return conn.execute(
+                'SELECT COUNT(*) FROM bot_users WHERE bot_token = ?',
+                (bot_token,)
+            ).fetchone()[0]
     
     def delete_bot_user(self, user_id, bot_token, username):
+        # bot_users может лежать в другом файле, поэтому владелец проверяется отдельно
         self.cursor.execute(
-            'DELETE FROM bot_users WHERE bot_token = ? AND username = ? AND bot_token IN (SELECT bot_token FROM mirror_bots WHERE user_id = ?)',
-            (bot_token, username, user_id)
+            'SELECT 1 FROM mirror_bots WHERE bot_token = ? AND user_id = ?',
+            (bot_token, user_id)
         )
-        self.conn.commit()
-        return self.cursor.rowcount > 0
+        if self.cursor.fetchone() is None:
+            return False
+        
+        with self.backend.tenant(bot_token) as conn:
+            cursor = conn.execute(
+                'DELETE FROM bot_users WHERE bot_token = ? AND username = ?',
+                (bot_token, username)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
     
     def save_message(self, bot_token, message_text):
-        self.cursor.execute(
-            'INSERT INTO messages (bot_token, message_text) VALUES (?, ?)',
-            (bot_token, message_text)
-        )
-        self.conn.commit()
+        with self.backend.tenant(bot_token) as conn:
+            conn.execute(
+                'INSERT INTO messages (bot_token, message_text) VALUES (?, ?)',
+                (bot_token, message_text)
+            )
+            conn.commit()
     
     def get_bot_messages(self, bot_token):
-        self.cursor.execute(
-            'SELECT * FROM messages WHERE bot_token = ? ORDER BY created_at DESC LIMIT 500',
-            (bot_token,)
-        )
-        return self.cursor.fetchall()
+        with self.backend.tenant(bot_token) as conn:
+            return conn.execute(
+                'SELECT * FROM messages WHERE bot_token = ? ORDER BY created_at DESC LIMIT 500',
+                (bot_token,)
+            ).fetchall()
     
     def update_bot_activity(self, bot_token):
         self.cursor.execute(
@@ -171,6 +133,7 @@ class Database:
             (bot_token,)
         )
         self.conn.commit()
+        self.registry.touch(bot_token)
     
     def check_inactive_bots(self):
         cutoff_date = datetime.now() - timedelta(days=7)
@@ -181,7 +144,10 @@ class Database:
             (cutoff_date,)
         )
         self.conn.commit()
-        return self.cursor.rowcount
+        count = self.cursor.rowcount
+        if count > 0:
+            self._notify()
+        return count
     
     def toggle_bot_status(self, user_id, bot_token, enable):
         self.cursor.execute(
@@ -191,14 +157,16 @@ class Database:
             (1 if enable else 0, 'active' if enable else 'disabled', bot_token, user_id)
         )
         self.conn.commit()
-        return self.cursor.rowcount > 0
+        changed = self.cursor.rowcount > 0
+        if changed:
+            self._notify(bot_token)
+        return changed
     
     def get_bot_status(self, bot_token):
-        self.cursor.execute(
-            'SELECT is_enabled, status FROM mirror_bots WHERE bot_token = ?',
-            (bot_token,)
-        )
-        return self.cursor.fetchone()
+        bot = self.registry.get_by_token(bot_token)
+        if bot is None:
+            return None
+        return bot[7], bot[6]
     
     def add_bot_access(self, owner_id, bot_token, access_user_id):
         self.cursor.execute(
@@ -275,17 +243,23 @@ class Database:
             'DELETE FROM mirror_bots WHERE user_id = ? AND bot_token = ?',
             (user_id, bot_token)
         )
-        self.cursor.execute(
-            'DELETE FROM bot_users WHERE bot_token = ?',
-            (bot_token,)
-        )
-        self.cursor.execute(
-            'DELETE FROM messages WHERE bot_token = ?',
-            (bot_token,)
-        )
-        self.cursor.execute(
-            'DELETE FROM bot_access WHERE bot_token = ?',
-            (bot_token,)
-        )
-        self.conn.commit()
-        return self.cursor.rowcount > 0
\ No newline at end of file
+        if self.cursor.rowcount == 0:
+            self.conn.rollback()
+            return False
+        
+        try:
+            self.cursor.execute(
+                'DELETE FROM bot_access WHERE bot_token = ?',
+                (bot_token,)
+            )
+            # В однофайловом хранилище данные бота удаляются в той же транзакции
+            self.backend.clear_tenant(bot_token)
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        
+        # Файл шарда удаляется только после успешного коммита
+        self.backend.drop_tenant(bot_token)
+        self._notify(bot_token)
+        return True
\ No newline at end of file
@@ -9,7 +9,10 @@ from telegram.ext import (
     MessageHandler, filters, ContextTypes
 )
 
-from config import MAIN_BOT_TOKEN, ADMIN_ID, MIRROR_DOMAIN, MIRROR_PORT
+from config import (
+    MAIN_BOT_TOKEN, ADMIN_ID, MIRROR_DOMAIN, MIRROR_PORT,
+    STORAGE_BACKEND, SHARDS_DIR, MAX_OPEN_SHARDS
+)
 
 print("\n" + "="*60)
 print("🤖 ОСНОВНОЙ БОТ - Mirror Bot Creator")
@@ -27,10 +30,11 @@ print(f"✅ Домен для зеркал: {MIRROR_DOMAIN}:{MIRROR_PORT}")
 
 # Импортируем базу данных
 from database import Database
+from storage import MIRROR_BACKENDS, create_backend
 import threading
 from datetime import datetime
 
-db = Database()
+db = Database(backend=create_backend(STORAGE_BACKEND, shards_dir=SHARDS_DIR, max_open=MAX_OPEN_SHARDS))
 
 # Запускаем проверку неактивных ботов
 def check_inactive_bots():
@@ -84,13 +88,13 @@ async def my_mirrors(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         keyboard = []
         for bot in bots:
-            _, _, token, username, _, _, status, is_enabled = bot
+            bot_id, _, token, username, _, _, status, is_enabled = bot
             users_count = db.count_bot_users(token)
             status_emoji = "🟢" if is_enabled == 1 else "🔴"
             keyboard.append([
                 InlineKeyboardButton(
                     f"@{username} ({status_emoji}, 👥 {users_count})", 
-                    callback_data=f'bot_detail_{token[:10]}'
+                    callback_data=f'bot_detail_{bot_id}'
                 )
             ])
         
@@ -135,6 +139,12 @@ async def handle_bot_token(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Неверный формат токена!")
         return
     
+    if STORAGE_BACKEND not in MIRROR_BACKENDS:
+        logging.error(f"Хранилище '{STORAGE_BACKEND}' не поддерживает зеркальных ботов")
+        await update.message.reply_text("❌ Ошибка при создании бота!")
+        context.user_data['awaiting_token'] = False
+        return
+    
     try:
         from telegram import Bot
         temp_bot = Bot(token=token)
@@ -151,7 +161,10 @@ async def handle_bot_token(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 '--token', token,
                 '--owner', str(user_id),
                 '--domain', MIRROR_DOMAIN,
-                '--port', str(MIRROR_PORT)
+                '--port', str(MIRROR_PORT),
+                '--storage', STORAGE_BACKEND,
+                '--shards-dir', SHARDS_DIR,
+                '--max-open', str(MAX_OPEN_SHARDS)
             ])
             
             await update.message.reply_text(
@@ -209,8 +222,13 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     elif data == 'back_to_main':
         await start(update, context)
     elif data.startswith('bot_detail_'):
+        bot_id = data[len('bot_detail_'):]
+        bot = db.get_bot_by_id(int(bot_id)) if bot_id.isdigit() else None
+        if bot is None or not db.check_bot_access(query.from_user.id, bot[2]):
+            await query.answer("❌ Бот не найден!")
+            return
+        await query.answer()
         # ... обработка деталей бота ...
-        pass
     # ... остальные обработчики ...
 
 def main():
@@ -14,6 +14,7 @@ from aiohttp import web
 import argparse
 
 from database import Database
+from storage import MIRROR_BACKENDS, create_backend
 
 # Словарь для замены
 CYRILLIC_TO_LATIN = {
@@ -22,13 +23,13 @@ CYRILLIC_TO_LATIN = {
 }
 
 class MirrorBot:
-    def __init__(self, token, owner_id, domain, port):
+    def __init__(self, token, owner_id, domain, port, storage='single', shards_dir='shards', max_open=64):
         self.token = token
         self.owner_id = owner_id
         self.domain = domain
         self.port = port
         self.webhook_url = f"https://{domain}:{port}/webhook/{token}"
-        self.db = Database()
+        self.db = Database(backend=create_backend(storage, shards_dir=shards_dir, max_open=max_open))
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
@@ -114,10 +115,16 @@ def main():
     parser.add_argument('--owner', required=True)
     parser.add_argument('--domain', required=True)
     parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--storage', choices=MIRROR_BACKENDS, default='single')
+    parser.add_argument('--shards-dir', default='shards')
+    parser.add_argument('--max-open', type=int, default=64)
     
     args = parser.parse_args()
     
-    bot = MirrorBot(args.token, int(args.owner), args.domain, args.port)
+    bot = MirrorBot(
+        args.token, int(args.owner), args.domain, args.port,
+        args.storage, args.shards_dir, args.max_open
+    )
     asyncio.run(bot.run_webhook())
 
 if __name__ == '__main__':
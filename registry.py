@@ -0,0 +1,103 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class TenantRegistry:
+    """Снимок таблицы mirror_bots в памяти.
+
+    Загружается один раз при старте и обновляется по уведомлениям
+    из методов записи Database, поэтому поиск бота и проверка статуса
+    не читают строки из SQLite.
+
+    Основной бот и зеркала работают в разных процессах, поэтому изменения
+    из других процессов отслеживаются по счётчику mirror_bots_version
+    (его увеличивают триггеры на mirror_bots). Счётчик читается не чаще
+    раза в check_interval секунд; если он изменился — снимок перезагружается
+    целиком. Записи в bot_users, messages и другие таблицы его не трогают.
+    """
+
+    def __init__(self, conn, check_interval=1.0):
+        self.conn = conn
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._by_token = {}
+        self._by_username = {}
+        self._by_id = {}
+        self._version = None
+        self._checked_at = 0.0
+        self.reload()
+
+    def _read_version(self):
+        return self.conn.execute(
+            'SELECT version FROM mirror_bots_version WHERE id = 1'
+        ).fetchone()[0]
+
+    def _reload_locked(self):
+        # Чтение и замена снимка под одной блокировкой: параллельный refresh
+        # не может быть перезаписан более старыми данными
+        version = self._read_version()
+        rows = self.conn.execute('SELECT * FROM mirror_bots').fetchall()
+        self._by_token = {row[2]: row for row in rows}
+        self._by_username = {row[3]: row for row in rows}
+        self._by_id = {row[0]: row for row in rows}
+        self._version = version
+        self._checked_at = time.monotonic()
+
+    def reload(self):
+        with self._lock:
+            self._reload_locked()
+
+    def _check_version(self):
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if self._read_version() != self._version:
+                self._reload_locked()
+
+    def refresh(self, bot_token=None):
+        """Обработчик уведомления об изменении; без токена — полная перезагрузка"""
+        with self._lock:
+            if bot_token is None:
+                self._reload_locked()
+                return
+
+            row = self.conn.execute(
+                'SELECT * FROM mirror_bots WHERE bot_token = ?',
+                (bot_token,)
+            ).fetchone()
+
+            old = self._by_token.pop(bot_token, None)
+            if old is not None:
+                self._by_username.pop(old[3], None)
+                self._by_id.pop(old[0], None)
+            if row is not None:
+                self._by_token[row[2]] = row
+                self._by_username[row[3]] = row
+                self._by_id[row[0]] = row
+
+    def touch(self, bot_token):
+        """Обновляет last_activity в снимке без чтения из базы"""
+        # Тот же формат, что у CURRENT_TIMESTAMP в SQLite (UTC)
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            old = self._by_token.get(bot_token)
+            if old is None:
+                return
+            row = old[:5] + (now,) + old[6:]
+            self._by_token[row[2]] = row
+            self._by_username[row[3]] = row
+            self._by_id[row[0]] = row
+
+    def get_by_token(self, bot_token):
+        self._check_version()
+        return self._by_token.get(bot_token)
+
+    def get_by_username(self, username):
+        self._check_version()
+        return self._by_username.get(username)
+
+    def get_by_id(self, bot_id):
+        self._check_version()
+        return self._by_id.get(bot_id)
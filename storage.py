@@ -0,0 +1,264 @@
+import sqlite3
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Глобальные таблицы: боты, доступы, рассылка
+CONTROL_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS mirror_bots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        bot_token TEXT UNIQUE,
+        bot_username TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'active',
+        is_enabled BOOLEAN DEFAULT 1
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS bot_access (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        bot_token TEXT,
+        user_id INTEGER,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(bot_token, user_id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS subscribers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER UNIQUE,
+        subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # Счётчик изменений mirror_bots для сброса снимка TenantRegistry в других процессах.
+    # last_activity не учитывается: он меняется на каждое обновление и не влияет на маршрутизацию
+    '''
+    CREATE TABLE IF NOT EXISTS mirror_bots_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    ''',
+    'INSERT OR IGNORE INTO mirror_bots_version (id, version) VALUES (1, 0)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mirror_bots_version_insert
+    AFTER INSERT ON mirror_bots
+    BEGIN
+        UPDATE mirror_bots_version SET version = version + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mirror_bots_version_update
+    AFTER UPDATE OF user_id, bot_token, bot_username, status, is_enabled ON mirror_bots
+    BEGIN
+        UPDATE mirror_bots_version SET version = version + 1 WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS mirror_bots_version_delete
+    AFTER DELETE ON mirror_bots
+    BEGIN
+        UPDATE mirror_bots_version SET version = version + 1 WHERE id = 1;
+    END
+    ''',
+]
+
+# Данные конкретного зеркального бота
+TENANT_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS bot_users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        bot_token TEXT,
+        chat_name TEXT,
+        username TEXT,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        bot_token TEXT,
+        message_text TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+]
+
+
+def _apply_schema(conn, schema):
+    for statement in schema:
+        conn.execute(statement)
+    conn.commit()
+
+
+class SingleFileBackend:
+    """Все таблицы в одном файле SQLite"""
+
+    def __init__(self, db_name='mirror_bots.db'):
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        _apply_schema(self.conn, CONTROL_SCHEMA + TENANT_SCHEMA)
+
+    def control(self):
+        return self.conn
+
+    @contextmanager
+    def tenant(self, bot_token):
+        yield self.conn
+
+    def clear_tenant(self, bot_token):
+        """Вызывается внутри транзакции Database.delete_bot, до коммита"""
+        self.conn.execute('DELETE FROM bot_users WHERE bot_token = ?', (bot_token,))
+        self.conn.execute('DELETE FROM messages WHERE bot_token = ?', (bot_token,))
+
+    def drop_tenant(self, bot_token):
+        """Вызывается после коммита Database.delete_bot"""
+        pass
+
+
+class MemoryBackend(SingleFileBackend):
+    """Хранилище в памяти для тестов"""
+
+    def __init__(self):
+        super().__init__(':memory:')
+
+
+class ShardedBackend:
+    """Управляющая база + отдельный файл на каждого бота.
+
+    Файлы ботов открываются по требованию, число открытых соединений
+    ограничено max_open (вытесняются давно не использованные). Соединение
+    выдаётся только внутри `with backend.tenant(token)` и не закрывается,
+    пока используется.
+    """
+
+    def __init__(self, control_db='mirror_bots.db', shards_dir='shards', max_open=64):
+        self.conn = sqlite3.connect(control_db, check_same_thread=False)
+        _apply_schema(self.conn, CONTROL_SCHEMA)
+        self.shards_dir = shards_dir
+        self.max_open = max_open
+        self._shards = OrderedDict()
+        self._refs = {}
+        self._lock = threading.Lock()
+        os.makedirs(shards_dir, exist_ok=True)
+        self._migrate_legacy_tables()
+
+    def control(self):
+        return self.conn
+
+    def _shard_path(self, bot_token):
+        # Токен не должен попадать в имя файла
+        digest = hashlib.sha256(bot_token.encode()).hexdigest()[:16]
+        return os.path.join(self.shards_dir, f'{digest}.db')
+
+    def _migrate_legacy_tables(self):
+        """Переносит bot_users/messages из однофайловой базы в шарды"""
+        legacy = [
+            row[0] for row in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' "
+                "AND name IN ('bot_users', 'messages')"
+            )
+        ]
+        if not legacy:
+            return
+
+        for table in legacy:
+            # Строки без bot_token не принадлежат ни одному боту и не переносятся
+            tokens = [
+                row[0] for row in self.conn.execute(
+                    f'SELECT DISTINCT bot_token FROM {table} WHERE bot_token IS NOT NULL'
+                )
+            ]
+            for bot_token in tokens:
+                rows = self.conn.execute(
+                    f'SELECT * FROM {table} WHERE bot_token = ?', (bot_token,)
+                ).fetchall()
+                if not rows:
+                    continue
+                placeholders = ', '.join('?' * len(rows[0]))
+                with self.tenant(bot_token) as conn:
+                    # Повторный запуск после сбоя не должен дублировать строки
+                    conn.execute(f'DELETE FROM {table} WHERE bot_token = ?', (bot_token,))
+                    conn.executemany(f'INSERT INTO {table} VALUES ({placeholders})', rows)
+                    conn.commit()
+            print(f"✅ Таблица {table} перенесена в шарды ({len(tokens)} ботов)")
+
+        for table in legacy:
+            self.conn.execute(f'DROP TABLE {table}')
+        self.conn.commit()
+
+    def _evict(self):
+        # Вызывается под self._lock; занятые соединения не трогаем
+        for bot_token in list(self._shards):
+            if len(self._shards) <= self.max_open:
+                break
+            conn = self._shards[bot_token]
+            if self._refs.get(conn, 0) == 0:
+                del self._shards[bot_token]
+                conn.close()
+
+    def _acquire(self, bot_token):
+        with self._lock:
+            conn = self._shards.get(bot_token)
+            if conn is None:
+                conn = sqlite3.connect(self._shard_path(bot_token), check_same_thread=False)
+                _apply_schema(conn, TENANT_SCHEMA)
+                self._shards[bot_token] = conn
+            else:
+                self._shards.move_to_end(bot_token)
+            self._refs[conn] = self._refs.get(conn, 0) + 1
+            self._evict()
+            return conn
+
+    def _release(self, bot_token, conn):
+        with self._lock:
+            self._refs[conn] -= 1
+            if self._refs[conn] > 0:
+                return
+            del self._refs[conn]
+            if self._shards.get(bot_token) is not conn:
+                # Шард удалён (drop_tenant), пока соединение было занято
+                conn.close()
+            else:
+                self._evict()
+
+    @contextmanager
+    def tenant(self, bot_token):
+        conn = self._acquire(bot_token)
+        try:
+            yield conn
+        finally:
+            self._release(bot_token, conn)
+
+    def clear_tenant(self, bot_token):
+        # Файл шарда нельзя удалить в рамках транзакции управляющей базы
+        pass
+
+    def drop_tenant(self, bot_token):
+        """Удаляет файл шарда; вызывается только после коммита удаления бота"""
+        with self._lock:
+            conn = self._shards.pop(bot_token, None)
+            if conn is not None and conn not in self._refs:
+                conn.close()
+            path = self._shard_path(bot_token)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+BACKENDS = ('single', 'sharded', 'memory')
+
+# memory не годится для зеркал: у каждого процесса была бы своя пустая база
+MIRROR_BACKENDS = ('single', 'sharded')
+
+
+def create_backend(kind='single', db_name='mirror_bots.db', shards_dir='shards', max_open=64):
+    if kind == 'single':
+        return SingleFileBackend(db_name)
+    if kind == 'sharded':
+        return ShardedBackend(db_name, shards_dir, max_open)
+    if kind == 'memory':
+        return MemoryBackend()
+    raise ValueError(f"Неизвестный тип хранилища: {kind}")
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Database
+from storage import create_backend
+
+TOKEN = '111:aaa'
+
+
+@pytest.fixture
+def db():
+    return Database(backend=create_backend('memory'))
+
+
+def test_add_indexes_by_token_username_and_id(db):
+    assert db.get_bot_by_token(TOKEN) is None
+
+    db.add_mirror_bot(1, TOKEN, 'mirror_one_bot')
+
+    bot = db.get_bot_by_token(TOKEN)
+    assert bot[1] == 1
+    assert db.get_bot_by_username('mirror_one_bot') == bot
+    assert db.get_bot_by_id(bot[0]) == bot
+    assert db.get_bot_status(TOKEN) == (1, 'active')
+
+
+def test_toggle_refreshes_status(db):
+    db.add_mirror_bot(1, TOKEN, 'mirror_one_bot')
+
+    db.toggle_bot_status(1, TOKEN, False)
+    assert db.get_bot_status(TOKEN) == (0, 'disabled')
+
+    db.toggle_bot_status(1, TOKEN, True)
+    assert db.get_bot_status(TOKEN) == (1, 'active')
+
+
+def test_delete_removes_all_indexes(db):
+    db.add_mirror_bot(1, TOKEN, 'mirror_one_bot')
+    bot_id = db.get_bot_by_token(TOKEN)[0]
+
+    db.delete_bot(1, TOKEN)
+
+    assert db.get_bot_by_token(TOKEN) is None
+    assert db.get_bot_by_username('mirror_one_bot') is None
+    assert db.get_bot_by_id(bot_id) is None
+    assert db.get_bot_status(TOKEN) is None
+
+
+def test_inactivity_sweep_reloads(db):
+    db.add_mirror_bot(1, TOKEN, 'mirror_one_bot')
+    db.conn.execute(
+        'UPDATE mirror_bots SET last_activity = ? WHERE bot_token = ?',
+        (datetime.now() - timedelta(days=30), TOKEN)
+    )
+    db.conn.commit()
+
+    assert db.check_inactive_bots() == 1
+    assert db.get_bot_status(TOKEN) == (0, 'inactive')
+
+
+def test_activity_updates_snapshot_in_place(db):
+    db.add_mirror_bot(1, TOKEN, 'mirror_one_bot')
+    db.conn.execute(
+        "UPDATE mirror_bots SET last_activity = '2000-01-01 00:00:00' WHERE bot_token = ?",
+        (TOKEN,)
+    )
+    db.conn.commit()
+    db.registry.reload()
+
+    db.update_bot_activity(TOKEN)
+
+    assert db.get_bot_by_token(TOKEN)[5] != '2000-01-01 00:00:00'
+
+
+def test_sees_writes_from_other_connection(tmp_path):
+    path = str(tmp_path / 'mirror_bots.db')
+    main_db = Database(path)
+    mirror_db = Database(path)
+    mirror_db.registry.check_interval = 0
+
+    main_db.add_mirror_bot(1, TOKEN, 'mirror_one_bot')
+    assert mirror_db.get_bot_status(TOKEN) == (1, 'active')
+
+    main_db.toggle_bot_status(1, TOKEN, False)
+    assert mirror_db.get_bot_status(TOKEN) == (0, 'disabled')
+
+    main_db.delete_bot(1, TOKEN)
+    assert mirror_db.get_bot_by_token(TOKEN) is None
+
+
+def test_tenant_writes_do_not_reload_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / 'mirror_bots.db')
+    main_db = Database(path)
+    mirror_db = Database(path)
+    mirror_db.registry.check_interval = 0
+    main_db.add_mirror_bot(1, TOKEN, 'mirror_one_bot')
+    mirror_db.get_bot_by_token(TOKEN)
+
+    reloads = []
+    original = mirror_db.registry._reload_locked
+    monkeypatch.setattr(
+        mirror_db.registry, '_reload_locked',
+        lambda: (reloads.append(1), original())
+    )
+
+    for _ in range(5):
+        main_db.save_message(TOKEN, 'hello')
+        main_db.add_users_to_bot(TOKEN, 'chat', ['x'])
+        main_db.add_subscriber(42)
+        main_db.update_bot_activity(TOKEN)
+        assert mirror_db.get_bot_status(TOKEN) == (1, 'active')
+
+    assert reloads == []
+
+
+def test_version_check_is_throttled(tmp_path):
+    path = str(tmp_path / 'mirror_bots.db')
+    main_db = Database(path)
+    mirror_db = Database(path)
+    mirror_db.registry.check_interval = 3600
+
+    main_db.add_mirror_bot(1, TOKEN, 'mirror_one_bot')
+    assert mirror_db.get_bot_by_token(TOKEN) is None
+
+    mirror_db.registry.check_interval = 0
+    assert mirror_db.get_bot_by_token(TOKEN) is not None
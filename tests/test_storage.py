@@ -0,0 +1,194 @@
+import os
+import sqlite3
+
+import pytest
+
+from database import Database
+from storage import ShardedBackend, SingleFileBackend, create_backend
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    return ShardedBackend(
+        str(tmp_path / 'mirror_bots.db'), str(tmp_path / 'shards'), max_open=2
+    )
+
+
+def test_memory_backend_roundtrip():
+    db = Database(backend=create_backend('memory'))
+    db.add_mirror_bot(1, '1:a', 'a_bot')
+
+    db.add_users_to_bot('1:a', 'chat', ['x', ' y '])
+    db.save_message('1:a', 'hello')
+
+    assert db.count_bot_users('1:a') == 2
+    assert [row[3] for row in db.get_bot_users('1:a')] == ['x', 'y']
+    assert db.get_bot_messages('1:a')[0][2] == 'hello'
+
+
+def test_shards_are_isolated(sharded):
+    db = Database(backend=sharded)
+    db.add_mirror_bot(1, '1:a', 'a_bot')
+    db.add_mirror_bot(2, '2:b', 'b_bot')
+
+    db.add_users_to_bot('1:a', 'chat', ['x', 'y'])
+    db.add_users_to_bot('2:b', 'chat', ['z'])
+
+    assert db.count_bot_users('1:a') == 2
+    assert db.count_bot_users('2:b') == 1
+    assert sharded._shard_path('1:a') != sharded._shard_path('2:b')
+    assert os.path.exists(sharded._shard_path('1:a'))
+    assert os.path.exists(sharded._shard_path('2:b'))
+
+
+def test_lru_evicts_idle_shards(sharded):
+    for token in ('1:a', '2:b', '3:c'):
+        with sharded.tenant(token):
+            pass
+
+    assert list(sharded._shards) == ['2:b', '3:c']
+
+
+def test_eviction_keeps_shard_in_use(sharded):
+    with sharded.tenant('1:a') as held:
+        for token in ('2:b', '3:c', '4:d'):
+            with sharded.tenant(token):
+                pass
+        assert held.execute('SELECT COUNT(*) FROM bot_users').fetchone() == (0,)
+
+    assert list(sharded._shards) == ['1:a', '4:d']
+
+
+def test_dropped_shard_in_use_closes_on_release(sharded):
+    with sharded.tenant('1:a') as held:
+        sharded.drop_tenant('1:a')
+        held.execute('SELECT 1')
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        held.execute('SELECT 1')
+
+
+def test_drop_tenant_removes_file(sharded):
+    db = Database(backend=sharded)
+    db.add_mirror_bot(1, '1:a', 'a_bot')
+    db.add_users_to_bot('1:a', 'chat', ['x'])
+    path = sharded._shard_path('1:a')
+    assert os.path.exists(path)
+
+    db.delete_bot(1, '1:a')
+
+    assert not os.path.exists(path)
+    assert '1:a' not in sharded._shards
+
+
+def test_delete_bot_user_checks_owner(sharded):
+    db = Database(backend=sharded)
+    db.add_mirror_bot(1, '1:a', 'a_bot')
+    db.add_users_to_bot('1:a', 'chat', ['x'])
+
+    assert not db.delete_bot_user(2, '1:a', 'x')
+    assert db.delete_bot_user(1, '1:a', 'x')
+    assert db.count_bot_users('1:a') == 0
+
+
+def test_single_file_delete_bot_drops_tenant_rows(tmp_path):
+    db = Database(backend=SingleFileBackend(str(tmp_path / 'mirror_bots.db')))
+    db.add_mirror_bot(1, '1:a', 'a_bot')
+    db.add_users_to_bot('1:a', 'chat', ['x'])
+    db.save_message('1:a', 'hello')
+
+    db.delete_bot(1, '1:a')
+
+    assert db.count_bot_users('1:a') == 0
+    assert db.get_bot_messages('1:a') == []
+
+
+class FailingCommit:
+    """Обёртка соединения, у которой коммит падает как при занятой базе"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def commit(self):
+        raise sqlite3.OperationalError('database is locked')
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_failed_commit_keeps_shard(sharded):
+    db = Database(backend=sharded)
+    db.add_mirror_bot(1, '1:a', 'a_bot')
+    db.add_users_to_bot('1:a', 'chat', ['x'])
+
+    db.conn = FailingCommit(db.conn)
+    with pytest.raises(sqlite3.OperationalError):
+        db.delete_bot(1, '1:a')
+    db.conn = db.conn._conn
+
+    assert db.get_bot_by_token('1:a') is not None
+    assert os.path.exists(sharded._shard_path('1:a'))
+    assert db.count_bot_users('1:a') == 1
+    assert db.check_bot_access(1, '1:a')
+
+
+def test_failed_commit_keeps_single_file_rows(tmp_path):
+    db = Database(backend=SingleFileBackend(str(tmp_path / 'mirror_bots.db')))
+    db.add_mirror_bot(1, '1:a', 'a_bot')
+    db.add_users_to_bot('1:a', 'chat', ['x'])
+
+    db.conn = FailingCommit(db.conn)
+    with pytest.raises(sqlite3.OperationalError):
+        db.delete_bot(1, '1:a')
+    db.conn = db.conn._conn
+
+    assert db.get_bot_by_token('1:a') is not None
+    assert db.count_bot_users('1:a') == 1
+
+
+def test_delete_bot_by_non_owner_keeps_access(sharded):
+    db = Database(backend=sharded)
+    db.add_mirror_bot(1, '1:a', 'a_bot')
+    db.add_bot_access(1, '1:a', 2)
+    db.add_users_to_bot('1:a', 'chat', ['x'])
+
+    assert not db.delete_bot(2, '1:a')
+
+    assert db.get_bot_access_users('1:a') == [1, 2]
+    assert db.count_bot_users('1:a') == 1
+
+
+def test_sharded_migrates_single_file_data(tmp_path):
+    path = str(tmp_path / 'mirror_bots.db')
+    single = Database(path)
+    single.add_mirror_bot(1, '1:a', 'a_bot')
+    single.add_users_to_bot('1:a', 'chat', ['x', 'y'])
+    single.save_message('1:a', 'hello')
+    single.conn.close()
+
+    backend = ShardedBackend(path, str(tmp_path / 'shards'))
+    db = Database(backend=backend)
+
+    assert db.count_bot_users('1:a') == 2
+    assert db.get_bot_messages('1:a')[0][2] == 'hello'
+    tables = {
+        row[0] for row in backend.control().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    assert 'bot_users' not in tables
+    assert 'messages' not in tables
+
+
+def test_migration_skips_rows_without_token(tmp_path):
+    path = str(tmp_path / 'mirror_bots.db')
+    single = Database(path)
+    single.add_mirror_bot(1, '1:a', 'a_bot')
+    single.save_message('1:a', 'hello')
+    single.conn.execute("INSERT INTO messages (bot_token, message_text) VALUES (NULL, 'orphan')")
+    single.conn.commit()
+    single.conn.close()
+
+    db = Database(backend=ShardedBackend(path, str(tmp_path / 'shards')))
+
+    assert [row[2] for row in db.get_bot_messages('1:a')] == ['hello']